@@ -1,52 +1,78 @@
 from aocd import get_data # type: ignore
-from enum import Enum
 from dataclasses import dataclass
-from typing import List
+from array import array
+from typing import List, Tuple, Iterable, Dict, Union
+import numpy as np
 
 
-class Signal(Enum):
-    FINISHED = 0
-    BLOCKING = 1
-
-@dataclass
-class Instruction:
-
-    def tick(self) -> Signal:
-        self.counter -= 1
-        if self.counter == 0:
-            return Signal.FINISHED
-        return Signal.BLOCKING
-
 @dataclass
-class NoOp(Instruction):
-    counter: int = 1
+class NoOp:
+    pass
 
 @dataclass
-class Add(Instruction):
+class Add:
     dx: int = 0
-    counter: int = 2
 
+Instruction = Union[NoOp, Add]
 Program = List[Instruction]
 
+NOOP, ADDX = 0, 1
+CYCLES = (1, 2)
+
+
+def compile_program(program: Program) -> Tuple[array, array]:
+    opcodes, args = array('b'), array('q')
+    for ix in program:
+        match ix:
+            case NoOp():
+                opcodes.append(NOOP)
+                args.append(0)
+            case Add(dx):
+                opcodes.append(ADDX)
+                args.append(dx)
+    return opcodes, args
+
+def register_trace(program: Program) -> np.ndarray:
+    # X during instruction i is the sum of every delta before it, and holds
+    # for as many cycles as the instruction takes. trace[c - 1] is X during
+    # cycle c.
+    opcodes, args = compile_program(program)
+    opcodes = np.frombuffer(opcodes, dtype=np.int8)
+    deltas = np.frombuffer(args, dtype=np.int64)
+    xs = 1 + np.cumsum(deltas) - deltas
+    return np.repeat(xs, np.array(CYCLES)[opcodes])
+
+def trace_signal_strength(trace: np.ndarray, idxs: List[int]) -> int:
+    idxs = np.asarray(idxs)
+    return int(np.sum(idxs * trace[idxs - 1]))
+
 
 class CRT:
 
     def __init__(self, width: int = 40, height: int = 6):
         self.width = width
         self.height = height
-        self.display = [['.'] * width for _ in range(height)]
+        self.display = bytearray(b'.' * (width * height))
         self.beampos = 0
 
     def render(self, spritepos: int):
-        beamx, beamy = (
-            self.beampos % self.width,
-            (self.beampos // self.width) % self.height
-        )
-        if abs(beamx - spritepos) <= 1:
-            self.display[beamy][beamx] = '#'
+        beampos = self.beampos % len(self.display)
+        if abs(beampos % self.width - spritepos) <= 1:
+            self.display[beampos] = ord('#')
+
+    def render_trace(self, trace: np.ndarray):
+        beampos = np.arange(self.beampos, self.beampos + len(trace))
+        lit = np.abs(beampos % self.width - trace) <= 1
+        pixels = np.bincount(beampos[lit] % len(self.display), minlength=len(self.display))
+        display = np.frombuffer(self.display, dtype=np.uint8)
+        display[pixels > 0] = ord('#')
+        self.beampos += len(trace)
 
     def show(self):
-        return '\n'.join([''.join(row) for row in self.display])
+        return '\n'.join(
+            self.display[row:row + self.width].decode()
+            for row in range(0, len(self.display), self.width)
+        )
 
     def tick(self):
         self.beampos += 1
@@ -56,31 +82,30 @@ class Machine:
 
     def __init__(self, program: Program):
         self.program = program
-        self._ixptr = 0
+        self.opcodes, self.args = compile_program(program)
         self.x = 1
-        self.signal: List[int] = []
+        self.signal: Dict[int, int] = {}
         self.crt = CRT()
 
-    def execute(self):
-        while self._ixptr < len(self.program):
-            self.tick(self.program[self._ixptr])
-
-    def tick(self, ix: Instruction):
-        print(ix)
-        self.crt.render(spritepos=self.x)
-        self.crt.tick()
-        self.signal.append(self.x)
-        match ix.tick(), ix:
-            case Signal.BLOCKING, _:
-                pass
-            case Signal.FINISHED, Add(dx, _):
-                self.x += dx
-                self._ixptr += 1
-            case Signal.FINISHED, NoOp(_):
-                self._ixptr += 1
+    def execute(self, samples: Iterable[int] = ()):
+        # Only the register values at the requested cycles are kept.
+        samples = set(samples)
+        crt, x, cycle = self.crt, self.x, 0
+        for op, arg in zip(self.opcodes, self.args):
+            for _ in range(CYCLES[op]):
+                crt.render(spritepos=x)
+                crt.tick()
+                cycle += 1
+                if cycle in samples:
+                    self.signal[cycle] = x
+            x += arg
+        self.x = x
 
     def signal_strength(self, idxs: List[int]) -> int:
-        return sum(idx * self.signal[idx - 1] for idx in idxs)
+        missing = [idx for idx in idxs if idx not in self.signal]
+        if missing:
+            raise ValueError(f"Cycles {missing} were not sampled during execution")
+        return sum(idx * self.signal[idx] for idx in idxs)
 
 
 def parse_data(data: str) -> Program:
@@ -100,9 +125,10 @@ if __name__ == '__main__':
     data = get_data(day=10, year=2022)
     program = parse_data(data)
 
+    SAMPLES = [20, 60, 100, 140, 180, 220]
     machine = Machine(program)
-    machine.execute()
-    ss = machine.signal_strength([20, 60, 100, 140, 180, 220])
+    machine.execute(SAMPLES)
+    ss = machine.signal_strength(SAMPLES)
     print(f"The signal strength is {ss}")
 
     print(machine.crt.show())
\ No newline at end of file
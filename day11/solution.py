@@ -1,11 +1,22 @@
+from aocd import get_data # type: ignore
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Callable, Dict
+from enum import Enum
+from math import lcm
+from os import cpu_count
+from typing import List, Dict, Tuple, Optional
+import numpy as np
 
 
-WORRY_MODULUS_LCM = 11 * 3 * 5 * 7 * 19 * 2 * 13 * 17
-
 Worry = int
 MonkeyId = int
+Hands = Dict[MonkeyId, List[Worry]]
+
+
+class Operator(Enum):
+    ADD = 0
+    MULTIPLY = 1
+    SQUARE = 2
 
 
 @dataclass
@@ -22,66 +33,70 @@ class Monkey:
     def __init__(
         self,
         items: List[Item],
-        operation: Callable[[Worry], Worry],
-        test: Callable[[Worry], MonkeyId]
+        operator: Operator,
+        operand: int,
+        divisor: int,
+        iftrue: MonkeyId,
+        iffalse: MonkeyId
     ):
-        self.id = id
         self.items = items
-        self.operation = operation
-        self.test = test
+        self.operator = operator
+        self.operand = operand
+        self.divisor = divisor
+        self.iftrue = iftrue
+        self.iffalse = iffalse
         self.n_inspections = 0
 
+    def operation(self, w: Worry) -> Worry:
+        match self.operator:
+            case Operator.ADD:
+                return w + self.operand
+            case Operator.MULTIPLY:
+                return w * self.operand
+            case Operator.SQUARE:
+                return w * w
 
-def monkeys() -> Dict[MonkeyId, Monkey]:
-    return {
-        0: Monkey(
-            items = Item.from_list([56, 52, 58, 96, 70, 75, 72]),
-            operation = lambda w: w * 17,
-            test = lambda w: 2 if w % 11 == 0 else 3
-        ),
-        1: Monkey(
-            items = Item.from_list([75, 58, 86, 80, 55, 81]),
-            operation = lambda w: w + 7,
-            test = lambda w: 6 if w % 3 == 0 else 5
-        ),
-        2: Monkey(
-            items = Item.from_list([73, 68, 73, 90]),
-            operation = lambda w: w * w,
-            test = lambda w: 1 if w % 5 == 0 else 7
-        ),
-        3: Monkey(
-            items = Item.from_list([72, 89, 55, 51, 59]),
-            operation = lambda w: w + 1,
-            test = lambda w: 2 if w % 7 == 0 else 7
-        ),
-        4: Monkey(
-            items = Item.from_list([76, 76, 91]),
-            operation = lambda w: w * 3,
-            test = lambda w: 0 if w % 19 == 0 else 3
-        ),
-        5: Monkey(
-            items = Item.from_list([88]),
-            operation = lambda w: w + 4,
-            test = lambda w: 6 if w % 2 == 0 else 4
-        ),
-        6: Monkey(
-            items = Item.from_list([64, 63, 56, 50, 77, 55, 55, 86]),
-            operation = lambda w: w + 8,
-            test = lambda w: 4 if w % 13 == 0 else 0
-        ),
-        7: Monkey(
-            items = Item.from_list([79, 58]),
-            operation = lambda w: w + 6,
-            test = lambda w: 1 if w % 17 == 0 else 5
-        ),
-    }
+    def test(self, w: Worry) -> MonkeyId:
+        return self.iftrue if w % self.divisor == 0 else self.iffalse
+
+
+def parse_data(data: str) -> Dict[MonkeyId, Monkey]:
+    monkeys: Dict[MonkeyId, Monkey] = {}
+    for block in data.strip().split('\n\n'):
+        lines = [line.strip() for line in block.split('\n')]
+        mid = int(lines[0].removeprefix('Monkey ').removesuffix(':'))
+        monkeys[mid] = Monkey(
+            items=Item.from_list(parse_items(lines[1])),
+            **parse_operation(lines[2]),
+            divisor=int(lines[3].removeprefix('Test: divisible by ')),
+            iftrue=int(lines[4].removeprefix('If true: throw to monkey ')),
+            iffalse=int(lines[5].removeprefix('If false: throw to monkey ')),
+        )
+    return monkeys
+
+def parse_items(line: str) -> List[int]:
+    # line = 'Starting items: 79, 98'
+    _, items = line.split(':')
+    return [int(item) for item in items.split(',') if item.strip()]
+
+def parse_operation(line: str) -> Dict:
+    # line = 'Operation: new = old * 19'
+    match line.removeprefix('Operation: new = ').split(' '):
+        case 'old', '*', 'old':
+            return {'operator': Operator.SQUARE, 'operand': 0}
+        case 'old', '*', n:
+            return {'operator': Operator.MULTIPLY, 'operand': int(n)}
+        case 'old', '+', n:
+            return {'operator': Operator.ADD, 'operand': int(n)}
+        case _:
+            raise ValueError(f"Unknown operation in line {line}")
 
 
 class MonkeyBusiness:
 
     def __init__(
         self,
-        monkeys: List[Monkey],
+        monkeys: Dict[MonkeyId, Monkey],
         n_rounds=20,
         dividethree: bool = False,
         modulolcm: bool = False,
@@ -90,6 +105,7 @@ class MonkeyBusiness:
         self.remaining_rounds = n_rounds
         self.dividethree = dividethree
         self.modlulolcm = modulolcm
+        self.modulus = lcm(*(monkey.divisor for monkey in monkeys.values()))
 
     def play(self):
         while self.remaining_rounds > 0:
@@ -98,20 +114,168 @@ class MonkeyBusiness:
             self.remaining_rounds -= 1
 
     def monkey_around(self, monkey: Monkey):
-        for item in monkey.items:
-            monkey.n_inspections += 1
-            item.worry = monkey.operation(item.worry)
+        # Apply the operation to the whole hand at once, with the operator
+        # resolved once per monkey rather than once per item.
+        worries = [item.worry for item in monkey.items]
+        match monkey.operator:
+            case Operator.ADD:
+                worries = [w + monkey.operand for w in worries]
+            case Operator.MULTIPLY:
+                worries = [w * monkey.operand for w in worries]
+            case Operator.SQUARE:
+                worries = [w * w for w in worries]
+        if self.dividethree:
+            worries = [w // 3 for w in worries]
+        if self.modlulolcm:
+            worries = [w % self.modulus for w in worries]
+
+        iftrue = self.monkeys[monkey.iftrue].items
+        iffalse = self.monkeys[monkey.iffalse].items
+        for item, worry in zip(monkey.items, worries):
+            item.worry = worry
+            if worry % monkey.divisor == 0:
+                iftrue.append(item)
+            else:
+                iffalse.append(item)
+        monkey.n_inspections += len(monkey.items)
+        monkey.items = []
+
+    def play_vectorised(self):
+        # Every item's worry and holder live in two arrays, and each monkey's
+        # turn is a masked update. Items thrown to a later monkey are picked
+        # up in the same round because the holders are updated in place.
+        items = [item for monkey in self.monkeys.values() for item in monkey.items]
+        holders = np.array([
+            mid for mid, monkey in self.monkeys.items() for _ in monkey.items
+        ], dtype=np.int64)
+        # Every operation has to fit in an int64, otherwise fall back to Python
+        # ints. Worries stay below the modulus once reduced, but the starting
+        # worries and the operands can be larger than that.
+        largest = max(
+            self.modulus,
+            *(monkey.operand for monkey in self.monkeys.values()),
+            *(item.worry for item in items)
+        )
+        bounded = self.modlulolcm and largest ** 2 < np.iinfo(np.int64).max
+        worries = np.array(
+            [item.worry for item in items], dtype=np.int64 if bounded else object
+        )
+        while self.remaining_rounds > 0:
+            for mid, monkey in self.monkeys.items():
+                inhand = np.flatnonzero(holders == mid)
+                w = worries[inhand]
+                match monkey.operator:
+                    case Operator.ADD:
+                        w = w + monkey.operand
+                    case Operator.MULTIPLY:
+                        w = w * monkey.operand
+                    case Operator.SQUARE:
+                        w = w * w
+                if self.dividethree:
+                    w = w // 3
+                if self.modlulolcm:
+                    w = w % self.modulus
+                worries[inhand] = w
+                holders[inhand] = np.where(
+                    w % monkey.divisor == 0, monkey.iftrue, monkey.iffalse
+                )
+                monkey.n_inspections += len(inhand)
+            self.remaining_rounds -= 1
+
+        for monkey in self.monkeys.values():
+            monkey.items = []
+        for item, worry, holder in zip(items, worries.tolist(), holders.tolist()):
+            item.worry = worry
+            self.monkeys[holder].items.append(item)
+
+    def play_parallel(self, n_workers: Optional[int] = None):
+        # Items never interact, so deal them out across processes, play the
+        # rounds serially in each, and add up the inspection counts.
+        n_workers = n_workers or cpu_count() or 1
+        hands = {
+            mid: [item.worry for item in monkey.items]
+            for mid, monkey in self.monkeys.items()
+        }
+        for monkey in self.monkeys.values():
+            monkey.items = []
+        deals = [
+            {mid: worries[worker::n_workers] for mid, worries in hands.items()}
+            for worker in range(n_workers)
+        ]
+        with ProcessPoolExecutor(n_workers) as pool:
+            results = list(pool.map(play_hands, [self] * n_workers, deals))
+        for counts, hands in results:
+            for mid, monkey in self.monkeys.items():
+                monkey.n_inspections += counts[mid]
+                monkey.items.extend(Item.from_list(hands[mid]))
+        self.remaining_rounds = 0
+
+    def play_by_item(self):
+        # Items never interact, so the inspection counts are a sum over items
+        # each followed on their own. Only the counts are updated, the items
+        # stay where they started.
+        for mid, monkey in self.monkeys.items():
+            for item in monkey.items:
+                for target, count in self.follow_item(mid, item.worry).items():
+                    self.monkeys[target].n_inspections += count
+        self.remaining_rounds = 0
+
+    def follow_item(self, mid: MonkeyId, worry: Worry) -> Dict[MonkeyId, int]:
+        # An item's whole future is determined by who holds it and its worry.
+        # Once that pair repeats the item is in a cycle of `period` rounds,
+        # and the rest of the game is counted rather than played.
+        n_rounds = self.remaining_rounds
+        counts = {mid: 0 for mid in self.monkeys}
+        seen: Dict[Tuple[MonkeyId, Worry], int] = {}
+        inspections: List[Tuple[int, MonkeyId]] = []
+        round = 0
+        while round < n_rounds:
+            if (mid, worry) in seen:
+                break
+            seen[mid, worry] = len(inspections)
+            inspections.append((round, mid))
+            monkey = self.monkeys[mid]
+            worry = monkey.operation(worry)
             if self.dividethree:
-                item.worry //= 3
+                worry //= 3
             if self.modlulolcm:
-                item.worry %= WORRY_MODULUS_LCM
-            self.monkeys[monkey.test(item.worry)].items.append(item)
-        monkey.items = []
+                worry %= self.modulus
+            target = monkey.test(worry)
+            # Thrown to a monkey that hasn't had its turn yet this round.
+            if target <= mid:
+                round += 1
+            mid = target
+        else:
+            for _, mid in inspections:
+                counts[mid] += 1
+            return counts
+
+        cyclestart = seen[mid, worry]
+        period = round - inspections[cyclestart][0]
+        for _, mid in inspections[:cyclestart]:
+            counts[mid] += 1
+        for start, mid in inspections[cyclestart:]:
+            counts[mid] += (n_rounds - 1 - start) // period + 1
+        return counts
+
+
+def play_hands(business: MonkeyBusiness, hands: Hands) -> Tuple[Dict[MonkeyId, int], Hands]:
+    # Runs in a worker process, on that worker's own copy of the business.
+    for mid, monkey in business.monkeys.items():
+        monkey.items = Item.from_list(hands[mid])
+        monkey.n_inspections = 0
+    business.play()
+    return (
+        {mid: monkey.n_inspections for mid, monkey in business.monkeys.items()},
+        {mid: [item.worry for item in monkey.items] for mid, monkey in business.monkeys.items()}
+    )
 
 
 if __name__ == '__main__':
+    data = get_data(day=11, year=2022)
+
     business = MonkeyBusiness(
-        monkeys=monkeys(),
+        monkeys=parse_data(data),
         n_rounds=20,
         dividethree=True
     )
@@ -123,7 +287,7 @@ if __name__ == '__main__':
     print(inspections)
 
     business = MonkeyBusiness(
-        monkeys=monkeys(),
+        monkeys=parse_data(data),
         n_rounds=10_000,
         dividethree=False,
         modulolcm=True
@@ -133,4 +297,4 @@ if __name__ == '__main__':
         mid: monkey.n_inspections for mid, monkey in business.monkeys.items()
     }
     print("After 10000 rounds, each monkey has monkeyed around:")
-    print(inspections)
\ No newline at end of file
+    print(inspections)
@@ -1,15 +1,15 @@
 from aocd import get_data # type: ignore
+import hashlib
 import string
-from itertools import product
-from typing import Tuple, Dict, Set, List, Optional
+from typing import Tuple, Dict
+import numpy as np
 
 Coord = Tuple[int, int]
 Elevation = int
-Map = Dict[Coord, Elevation]
+Map = np.ndarray
 Distance = int
 
-N_ROW, N_COL = 41, 162
-MAX_DISTANCE: Distance = 666_666
+MAX_DISTANCE: Distance = np.iinfo(np.int32).max
 
 LOWEST, HIGHEST = 1, 26
 ELEVATIONS = {
@@ -18,86 +18,117 @@ ELEVATIONS = {
 }
 
 
+LOOKUP = np.zeros(256, dtype=np.int8)
+for letter, elevation in ELEVATIONS.items():
+    LOOKUP[ord(letter)] = elevation
+
+
 def parse_data(data: str) -> Tuple[Coord, Coord, Map]:
-    relief = [
-        [chr for chr in line.strip()]
-        for line in data.split('\n')
-    ]
-    start = next(
-        (x, y) for x, y in product(range(N_ROW), range(N_COL))
-        if relief[x][y] == 'S'
-    )
-    end = next(
-        (x, y) for x, y in product(range(N_ROW), range(N_COL))
-        if relief[x][y] == 'E'
-    )
-    N, M = len(relief), len(relief[0])
-    map = {
-        (x, y): ELEVATIONS[relief[x][y]]
-        for (x, y) in product(range(N), range(M))
-    }
+    lines = [line.strip() for line in data.strip().split('\n')]
+    relief = np.frombuffer(''.join(lines).encode(), dtype=np.uint8)
+    relief = relief.reshape(len(lines), len(lines[0]))
+    start = tuple(int(i) for i in np.argwhere(relief == ord('S'))[0])
+    end = tuple(int(i) for i in np.argwhere(relief == ord('E'))[0])
+    map = LOOKUP[relief]
+    if not map.all():
+        raise ValueError("Unknown elevation in map")
     return start, end, map
 
-def neighbour_mapping(map: Map, backwards: bool=False) -> Dict[Coord, List[Coord]]:
-    neighbours = {
-        coord: [] for coord in map.keys()
-    }
-    for (x, y), elev in map.items():
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            if dx == 0 and dy == 0:
-                continue
-            if x + dx < 0 or y + dy < 0 or x + dx > N_ROW - 1 or y + dy > N_COL - 1:
-                continue
-            destelev = map[(x + dx, y + dy)]
-            if backwards and elev - destelev <= 1:
-                neighbours[(x, y)].append((x + dx, y + dy))
-            elif not backwards and destelev - elev <= 1:
-                neighbours[(x, y)].append((x + dx, y + dy))
-    return neighbours
-
-
-class DijkstraWalker:
-
-    def __init__(self,start: Coord, end: Coord, map: Map, backwards: bool = False):
+
+class BFSWalker:
+    """Every step costs the same, so a plain breadth first search from the
+    source gives shortest distances. The search expands a whole frontier of
+    flat indices at a time, and `distances` holds MAX_DISTANCE wherever is
+    unreachable.
+    """
+
+    def __init__(self, start: Coord, end: Coord, map: Map, backwards: bool = False):
         self.start = start
         self.end = end
         self.backwards = backwards
         self.map = map
-        self.neighbours = neighbour_mapping(map, backwards)
-        self.visited: Dict[Coord, Distance] = {}
-        self.unvisited: Dict[Coord, Distance] = {
-            coord: MAX_DISTANCE for coord in map.keys()
-        }
+        self.distances = np.full(map.shape, MAX_DISTANCE, dtype=np.int32)
 
     def walk(self):
-        if self.backwards:
-            self.unvisited[self.end] = 0
-        else:
-            self.unvisited[self.start] = 0
-        while self.unvisited:
-            mindist = min(self.unvisited.values())
-            current = next(
-                coord for coord, dist in self.unvisited.items()
-                if dist == mindist
+        # Work on a copy padded by one cell all round, with the border marked
+        # as already visited, so neighbours never need a bounds check.
+        elevations = np.pad(self.map.astype(np.int32), 1).ravel()
+        distances = np.pad(self.distances, 1, constant_values=-1)
+        n_col = distances.shape[1]
+        distances = distances.ravel()
+        claims = np.zeros(distances.size, dtype=np.int64)
+        source = self.end if self.backwards else self.start
+        source = (source[0] + 1) * n_col + source[1] + 1
+        distances[source] = 0
+        # Forwards we can climb at most one, backwards we can drop at most one.
+        sign = -1 if self.backwards else 1
+        offsets = np.array([-n_col, n_col, -1, 1])
+
+        frontier, dist = np.array([source]), 0
+        while frontier.size:
+            dist += 1
+            nbrs = (frontier[:, None] + offsets).ravel()
+            limits = np.repeat(elevations[frontier] + sign, len(offsets))
+            fresh = (
+                (distances[nbrs] == MAX_DISTANCE)
+                & (sign * (elevations[nbrs] - limits) <= 0)
             )
-            for nbr in self.neighbours[current]:
-                if nbr in self.unvisited:
-                    self.unvisited[nbr] = min(self.unvisited[nbr], mindist + 1)
-            self.visited[current] = mindist
-            del self.unvisited[current]
+            nbrs = nbrs[fresh]
+            # A cell can be reached from several frontier cells at once, so
+            # keep only the one whose claim stuck to make the next frontier.
+            order = np.arange(nbrs.size)
+            claims[nbrs] = order
+            frontier = nbrs[claims[nbrs] == order]
+            distances[frontier] = dist
+        self.distances = distances.reshape(-1, n_col)[1:-1, 1:-1].copy()
+
+
+DISTANCE_FIELDS: Dict[Tuple[bytes, Coord], np.ndarray] = {}
+
+def distance_field(map: Map, summit: Coord) -> np.ndarray:
+    # Backward walks from the same summit on the same map are shared, keyed
+    # on a digest of the map contents, dtype and shape. The shared arrays are
+    # read only, so no caller can change them under another.
+    digest = hashlib.blake2b(map.tobytes())
+    digest.update(repr((map.dtype.str, map.shape)).encode())
+    key = (digest.digest(), summit)
+    if key not in DISTANCE_FIELDS:
+        walker = BFSWalker(summit, summit, map, backwards=True)
+        walker.walk()
+        walker.distances.setflags(write=False)
+        DISTANCE_FIELDS[key] = walker.distances
+    return DISTANCE_FIELDS[key]
+
+
+class SummitDistances:
+    """Answers distance to summit queries from one cached backward walk."""
+
+    def __init__(self, map: Map, summit: Coord):
+        self.distances = distance_field(map, summit)
+        # closest[k] is the shortest distance from any cell with elevation
+        # at most k, built once from per elevation minima.
+        closest = np.full(HIGHEST + 1, MAX_DISTANCE, dtype=np.int32)
+        np.minimum.at(closest, map.ravel(), self.distances.ravel())
+        self.closest = np.minimum.accumulate(closest)
+
+    def from_cell(self, coord: Coord) -> Distance:
+        return int(self.distances[coord])
+
+    def from_elevation(self, maxelevation: Elevation) -> Distance:
+        # Nothing lies below the lowest elevation, and a negative index would
+        # wrap round to the top of the table.
+        if maxelevation < 0:
+            return MAX_DISTANCE
+        return int(self.closest[min(maxelevation, HIGHEST)])
 
 
 if __name__ == '__main__':
     data = get_data(day=12, year=2022)
 
     start, end, map = parse_data(data)
-    walker = DijkstraWalker(start, end, map)
-    walker.walk()
-    print(f"The number of steps from start to end is: {walker.visited[walker.end]}")
-
-    walker = DijkstraWalker(start, end, map, backwards=True)
+    walker = BFSWalker(start, end, map)
     walker.walk()
+    print(f"The number of steps from start to end is: {walker.distances[walker.end]}")
 
-    elevation_zero = {coord for coord, elev in map.items() if elev == 1}
-    distances = {coord: walker.visited[coord] for coord in elevation_zero}
-    print(f"The minimum of steps from low elevation to end is: {min(distances.values())}")
\ No newline at end of file
+    summit = SummitDistances(map, end)
+    print(f"The minimum of steps from low elevation to end is: {summit.from_elevation(LOWEST)}")
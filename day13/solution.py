@@ -1,12 +1,18 @@
 
 from aocd import get_data # type: ignore
+import json
+import re
+from itertools import accumulate
 from enum import Enum
-from functools import cmp_to_key
 from typing import Union, List, Tuple
 
 
 Packet = List[Union[int, List['Packet']]]
 
+PACKET = re.compile(r"\[[\[\]\d,]*\]")
+BRACKETS = {'[': 1, ']': -1}
+MAX_DEPTH = 200
+
 DIVIDER2 = [[2]]
 DIVIDER6 = [[6]]
 
@@ -15,14 +21,31 @@ class Comparison(Enum):
     UNKNOWN = 0
     OUTOFORDER = 1
 
+def parse_packet(line: str) -> Packet:
+    # Only brackets, digits and commas are allowed through, so the JSON
+    # scanner can only ever build nested lists of ints, and it rejects
+    # anything unbalanced or with empty elements. Nesting is capped so that
+    # neither the scanner nor `compare` can run out of stack, and only needs
+    # measuring when there are enough brackets to go that deep.
+    if not PACKET.fullmatch(line):
+        raise ValueError(f"Malformed packet {line}")
+    if line.count('[') > MAX_DEPTH:
+        nesting = accumulate(BRACKETS.get(chr, 0) for chr in line)
+        if max(nesting) > MAX_DEPTH:
+            raise ValueError(f"Packet nested deeper than {MAX_DEPTH}")
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        raise ValueError(f"Malformed packet {line}")
+
 def parse_data(data: str) -> List[Tuple[Packet, Packet]]:
     pairs: List[Tuple[Packet, Packet]] = []
     left, right = None, None
     for ln, line in enumerate(data.split('\n')):
         if ln % 3 == 0:
-            left = eval(line)
+            left = parse_packet(line)
         elif ln % 3 == 1:
-            right = eval(line)
+            right = parse_packet(line)
         else:
             pairs.append((left, right))
             left, right = None, None
@@ -81,6 +104,42 @@ def compare_lists(xs: List[Packet], ys: List[Packet]) -> Comparison:
         return Comparison.UNKNOWN
 
 
+def packet_depth(packet: Packet) -> int:
+    # One more than the nesting level of the deepest list in the packet.
+    return 1 + max(
+        (packet_depth(p) for p in packet if isinstance(p, list)), default=0
+    )
+
+def sort_key(packet: Packet, depth: int) -> Tuple:
+    # An integer compares exactly like the singleton list holding it, so wrap
+    # every integer until they all sit `depth` levels down. With `depth` at
+    # least the packet_depth of everything being sorted, integers then only
+    # ever meet integers, and plain tuple order agrees with `compare`.
+    def encode(p: Packet, level: int):
+        if isinstance(p, int):
+            for _ in range(depth - level):
+                p = (p,)
+            return p
+        return tuple(encode(e, level + 1) for e in p)
+    return encode(packet, 0)
+
+def sort_packets(packets: List[Packet]) -> List[Packet]:
+    depth = max((packet_depth(p) for p in packets), default=0)
+    return sorted(packets, key=lambda p: sort_key(p, depth))
+
+
+def rank_packets(packets: List[Packet], probes: List[Packet]) -> List[int]:
+    # A probe's (one based) position in the sorted list is one more than the
+    # number of packets strictly before it, which one pass can count without
+    # sorting anything.
+    ranks = [1] * len(probes)
+    for packet in packets:
+        for idx, probe in enumerate(probes):
+            if compare(packet, probe) == Comparison.INORDER:
+                ranks[idx] += 1
+    return ranks
+
+
 if __name__ == '__main__':
     data = get_data(day=13, year=2022)
     pairs = parse_data(data)
@@ -92,12 +151,6 @@ if __name__ == '__main__':
     print(f"The index sum of the ordered pairs is {idxsum}")
 
     packets = to_packet_list(pairs)
-    packets = sorted(to_packet_list(pairs), key=cmp_to_key(compare_key))
-
-    for left, right in [(packets[i], packets[i+1]) for i in range(len(packets) - 1)]:
-        assert compare(left, right) == Comparison.INORDER
-
-    divider_2_idx = next(idx for idx, p in enumerate(packets, start=1) if p == DIVIDER2)
-    divider_6_idx = next(idx for idx, p in enumerate(packets, start=1) if p == DIVIDER6)
+    divider_2_idx, divider_6_idx = rank_packets(packets, [DIVIDER2, DIVIDER6])
     print(f"Packet positions are {divider_2_idx} and {divider_6_idx}")
     print(f"Decoder key is {divider_2_idx*divider_6_idx}")
\ No newline at end of file
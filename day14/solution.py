@@ -1,87 +1,108 @@
 from aocd import get_data # type: ignore
-from enum import Enum
-from typing import Union, List, Set, Tuple, Optional
+import re
+from typing import List, Tuple
+import numpy as np
 
 Coord = Tuple[int, int]
-Cave = Set[Coord]
+
+EMPTY, ROCK, SAND = 0, 1, 2
+SOURCE: Coord = (500, 0)
+
+
+class Cave:
+    """One byte per cell, rows are y and columns are x - xmin. There's a row
+    for the floor level at maxy + 1, and the columns cover the rock and the
+    whole triangle sand could spread over below the source.
+    """
+
+    def __init__(self, xmin: int, xmax: int, maxy: int):
+        self.xmin = xmin
+        self.maxy = maxy
+        self.grid = np.zeros((maxy + 2, xmax - xmin + 1), dtype=np.uint8)
+
+    def __contains__(self, coord: Coord) -> bool:
+        x, y = coord
+        return bool(self.grid[y, x - self.xmin] != EMPTY)
+
+    def add(self, coord: Coord, material: int = SAND):
+        x, y = coord
+        self.grid[y, x - self.xmin] = material
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.grid))
 
 
 def parse_data(data: str) -> Cave:
-    cave: Set[Coord] = set()
+    coords = [(int(x), int(y)) for x, y in re.findall(r"(\d+),(\d+)", data)]
+    maxy = max(y for _, y in coords)
+    spread = maxy + 1
+    cave = Cave(
+        xmin=min(min(x for x, _ in coords), SOURCE[0] - spread),
+        xmax=max(max(x for x, _ in coords), SOURCE[0] + spread),
+        maxy=maxy
+    )
     for line in data.split('\n'):
-        cave.update(parse_line(line))
+        parse_line(cave, line)
     return cave
 
-def parse_line(line: str) -> Set[Coord]:
+def parse_line(cave: Cave, line: str):
     coord_pairs: List[Coord] = []
     for token in line.split(' -> '):
         x, y = token.split(',')
         coord_pairs.append((int(x), int(y)))
 
-    newcoords: set[Coord] = set()
+    # Each segment is horizontal or vertical, so it's a single slice.
     prevx, prevy = coord_pairs[0]
     for x, y in coord_pairs[1:]:
-        if x == prevx and y > prevy:
-            newcoords.update((x, ny) for ny in range(prevy, y + 1))
-        if x == prevx and y < prevy:
-            newcoords.update((x, ny) for ny in range(y, prevy + 1))
-        if y == prevy and x > prevx:
-            newcoords.update((nx, y) for nx in range(prevx, x + 1))
-        if y == prevy and x < prevx:
-            newcoords.update((nx, y) for nx in range(x, prevx + 1))
+        xlo, xhi = sorted((prevx, x))
+        ylo, yhi = sorted((prevy, y))
+        cave.grid[ylo:yhi + 1, xlo - cave.xmin:xhi - cave.xmin + 1] = ROCK
         prevx, prevy = x, y
-    return newcoords
-
-
-def trickle_no_floor(cave: Cave, pos: Coord, maxy: int) -> Optional[Coord]:
-    assert pos not in cave
-    prevpos = None
-    while True and pos[1] < maxy:
-        prevpos = pos
-        if (pos[0], pos[1] + 1) not in cave:
-            pos = (pos[0], pos[1] + 1)
-        elif (pos[0] - 1, pos[1] + 1) not in cave:
-            pos = (pos[0] - 1, pos[1] + 1)
-        elif (pos[0] + 1, pos[1] + 1) not in cave:
-            pos = (pos[0] + 1, pos[1] + 1)
-        else:
-            break
-    if pos[1] >= maxy:
-        return None
-    else:
-        return prevpos
-
-def trickle_with_floor(cave: Cave, pos: Coord, maxy: int) -> Optional[Coord]:
-    assert pos not in cave
-    prevpos = None
-    while True:
-        prevpos = pos
-        # Check if we're on the floor of the cave.
-        if pos[1] == maxy + 1:
-            break
-        # Drop the sand.
-        elif (pos[0], pos[1] + 1) not in cave:
-            pos = (pos[0], pos[1] + 1)
-        elif (pos[0] - 1, pos[1] + 1) not in cave:
-            pos = (pos[0] - 1, pos[1] + 1)
-        elif (pos[0] + 1, pos[1] + 1) not in cave:
-            pos = (pos[0] + 1, pos[1] + 1)
-        # We're otherwise stuck.
-        else:
-            break
-    return prevpos
-
-def fill(cave: Cave, pos: Coord, maxy: int, floor: bool = False):
-    tricklef = [trickle_no_floor, trickle_with_floor][floor]
-    while True:
-        finalpos = tricklef(cave, pos, maxy)
-        if finalpos == pos:
-            cave.add(finalpos)
-            return
-        elif finalpos:
-            cave.add(finalpos)
-        else:
-            return
+
+
+def fill(cave: Cave, pos: Coord, floor: bool = False):
+    # Keep the path the last grain fell along. The next grain follows the
+    # same path right up to where the last one came to rest, so it can start
+    # falling from the point just above that. Cells are flat indices into a
+    # byte view of the grid, so each step is a plain integer offset.
+    width = cave.grid.shape[1]
+    cells = memoryview(cave.grid).cast('B')
+    path = [pos[1] * width + pos[0] - cave.xmin]
+    maxy, floory = cave.maxy, cave.maxy + 1
+    while path:
+        cell = path[-1]
+        y = cell // width
+        if not floor and y >= maxy:
+            return  # Falling into the void, as will every grain after it.
+        if floor and y == floory:
+            pass  # On the floor of the cave.
+        elif cells[cell + width] == EMPTY:
+            path.append(cell + width)
+            continue
+        elif cells[cell + width - 1] == EMPTY:
+            path.append(cell + width - 1)
+            continue
+        elif cells[cell + width + 1] == EMPTY:
+            path.append(cell + width + 1)
+            continue
+        cells[path.pop()] = SAND
+
+def count_floored_sand(cave: Cave, pos: Coord = SOURCE) -> int:
+    # With a floor, sand ends up resting on exactly the cells reachable from
+    # the source by falling down, down-left or down-right without passing
+    # through rock. So sweep down a row at a time, spreading each row's
+    # reachable cells one step sideways and masking out the rock below.
+    rock = cave.grid == ROCK
+    reachable = np.zeros(cave.grid.shape[1], dtype=bool)
+    reachable[pos[0] - cave.xmin] = True
+    n_sand = 1
+    for y in range(pos[1] + 1, cave.maxy + 2):
+        spread = reachable.copy()
+        spread[1:] |= reachable[:-1]
+        spread[:-1] |= reachable[1:]
+        reachable = spread & ~rock[y]
+        n_sand += int(np.count_nonzero(reachable))
+    return n_sand
 
 
 if __name__ == '__main__':
@@ -89,14 +110,9 @@ if __name__ == '__main__':
 
     cave = parse_data(data)
     n_rocks = len(cave)
-    maxrock = max(y for (_, y) in cave)
-    fill(cave, (500, 0), maxrock)
+    fill(cave, SOURCE)
     n_sand = len(cave) - n_rocks
     print(f"{n_sand} grains of sand have accumulated before voiding.")
 
-    cave = parse_data(data)
-    n_rocks = len(cave)
-    maxrock = max(y for (_, y) in cave)
-    fill(cave, (500, 0), maxrock, floor=True)
-    n_sand = len(cave) - n_rocks
+    n_sand = count_floored_sand(parse_data(data))
     print(f"{n_sand} grains of sand have accumulated before filling up.")
\ No newline at end of file
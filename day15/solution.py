@@ -1,11 +1,16 @@
 import re
-from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Event, shared_memory, synchronize
+from os import cpu_count
 from aocd import get_data # type: ignore
 from dataclasses import dataclass
-from typing import Union, List, Set, Tuple, Optional
+from typing import List, Tuple, Optional
+import numpy as np
 
 Coord = Tuple[int, int]
 Interval = Tuple[int, int]
+# One row per sensor: x, y and range.
+SensorArray = np.ndarray
 
 PATTERN = r"Sensor at x=(-?\d+), y=(-?\d+): closest beacon is at x=(-?\d+), y=(-?\d+)"
 
@@ -57,24 +62,59 @@ def union(i1: Interval, i2: Interval) -> Interval:
     )
 
 def reduce(intervals: List[Interval]) -> List[Interval]:
+    # Sorted by left end, each interval either extends the last merged one or
+    # starts a new one, so a single sweep does it.
     reduced: List[Interval] = []
+    for interval in sorted(intervals):
+        if reduced and overlaps(reduced[-1], interval):
+            reduced[-1] = union(reduced[-1], interval)
+        else:
+            reduced.append(interval)
+    return reduced
 
-    for interval in intervals:
-        overlapping = []
-        for test_interval in reduced:
-            if overlaps(interval, test_interval):
-                overlapping.append(test_interval)
-
-        reduced = [i for i in reduced if i not in overlapping]
-        match overlapping:
-            case []:
-                reduced.append(interval)
-            case [*ints]:
-                for i in ints:
-                    interval = union(interval, i)
-                reduced.append(interval)
 
-    return reduced
+def sensor_array(sensors: List[SensorInformation]) -> SensorArray:
+    return np.array(
+        [(*sensor.sensor, sensor.l1_distance) for sensor in sensors],
+        dtype=np.int64
+    ).reshape(-1, 3)
+
+
+def intervals_at_levels(
+    sensors: SensorArray,
+    ylevels: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Row i, column j is sensor j's interval at ylevels[i]. Sensors that don't
+    # reach a row get an empty interval, with left > right.
+    sx, sy, r = sensors[:, 0], sensors[:, 1], sensors[:, 2]
+    dx = r - np.abs(np.asarray(ylevels)[:, None] - sy)
+    return sx - dx, sx + dx
+
+
+def reduce_batch(
+    lefts: np.ndarray,
+    rights: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Merges every row at once, the same way as `reduce`. Each row is sorted
+    # by left end with a running maximum of the right ends, and a merged
+    # interval starts wherever a left end is past that maximum + 1. Returns
+    # the row index, start and end of every merged interval.
+    empty = lefts > rights
+    big = np.iinfo(np.int64).max // 4
+    lefts = np.where(empty, big, lefts)
+    rights = np.where(empty, -big, rights)
+    order = np.argsort(lefts, axis=1, kind='stable')
+    lefts = np.take_along_axis(lefts, order, axis=1)
+    reach = np.maximum.accumulate(np.take_along_axis(rights, order, axis=1), axis=1)
+    valid = lefts < big
+
+    starts = valid.copy()
+    starts[:, 1:] &= lefts[:, 1:] > reach[:, :-1] + 1
+    ends = valid.copy()
+    ends[:, :-1] &= ~(valid[:, 1:] & (lefts[:, 1:] <= reach[:, :-1] + 1))
+
+    rows = np.nonzero(starts)[0]
+    return rows, lefts[starts], reach[ends]
 
 
 def intersect(intervals: List[Interval], interval: Interval) -> List[Interval]:
@@ -106,6 +146,135 @@ def count_objects_in_interval_at_level(
     return len(sensors_at_level | beacons_at_level)
 
 
+def is_covered(sensors: List[SensorInformation], coord: Coord) -> bool:
+    return any(
+        l1_distance(sensor.sensor, coord) <= sensor.l1_distance
+        for sensor in sensors
+    )
+
+
+def find_uncovered(sensors: List[SensorInformation], maxxy: int) -> Optional[Coord]:
+    # A lone uncovered point has to sit just outside some sensors' ranges, on
+    # the diagonals at distance + 1. Those are lines x + y = a and x - y = b,
+    # so the only candidates are where an a-line crosses a b-line. On the edge
+    # of the search region the region itself hems the point in, so where
+    # either kind of line crosses an edge is a candidate too, as are the
+    # corners.
+    alines, blines = set(), set()
+    for sensor in sensors:
+        (x, y), r = sensor.sensor, sensor.l1_distance + 1
+        alines.update((x + y - r, x + y + r))
+        blines.update((x - y - r, x - y + r))
+    candidates = {(0, 0), (0, maxxy), (maxxy, 0), (maxxy, maxxy)}
+    candidates.update(
+        ((a + b) // 2, (a - b) // 2)
+        for a in alines for b in blines if (a + b) % 2 == 0
+    )
+    for a in alines:
+        candidates.update(((0, a), (maxxy, a - maxxy), (a, 0), (a - maxxy, maxxy)))
+    for b in blines:
+        candidates.update(((0, -b), (maxxy, maxxy - b), (b, 0), (b + maxxy, maxxy)))
+    return next(
+        (
+            (x, y) for x, y in sorted(candidates)
+            if 0 <= x <= maxxy and 0 <= y <= maxxy
+            and not is_covered(sensors, (x, y))
+        ),
+        None
+    )
+
+
+def first_gap_in_rows(
+    sensors: SensorArray,
+    ylo: int,
+    yhi: int,
+    maxx: int,
+    batch: int = 1024
+) -> Optional[Coord]:
+    # Scan rows ylo..yhi a batch at a time, clipping every interval to
+    # [0, maxx]. A row is covered only if it merges into one interval that
+    # starts at 0 and ends at maxx.
+    for start in range(ylo, yhi + 1, batch):
+        ylevels = np.arange(start, min(start + batch, yhi + 1))
+        lefts, rights = intervals_at_levels(sensors, ylevels)
+        rows, starts, ends = reduce_batch(
+            np.maximum(lefts, 0), np.minimum(rights, maxx)
+        )
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[1:] != rows[:-1]
+        covered = np.zeros(len(ylevels), dtype=bool)
+        covered[rows[first]] = (starts[first] == 0) & (ends[first] == maxx)
+        if covered.all():
+            continue
+        row = int(np.argmin(covered))
+        hit = np.flatnonzero(rows == row)
+        if len(hit) == 0 or starts[hit[0]] > 0:
+            return 0, int(ylevels[row])
+        return int(ends[hit[0]]) + 1, int(ylevels[row])
+    return None
+
+
+# Set in each worker process by `attach_sensors`.
+SHARED_MEMORY: Optional[shared_memory.SharedMemory] = None
+SHARED_SENSORS: Optional[SensorArray] = None
+STOP_SCANNING: Optional[synchronize.Event] = None
+
+def attach_sensors(name: str, shape: Tuple[int, int], stop: synchronize.Event):
+    global SHARED_MEMORY, SHARED_SENSORS, STOP_SCANNING
+    SHARED_MEMORY = shared_memory.SharedMemory(name=name)
+    SHARED_SENSORS = np.ndarray(shape, dtype=np.int64, buffer=SHARED_MEMORY.buf)
+    STOP_SCANNING = stop
+
+def scan_chunk(ylo: int, yhi: int, maxx: int, batch: int) -> Optional[Coord]:
+    # Check for cancellation between batches, so a worker gives up soon after
+    # another one has found the gap.
+    for start in range(ylo, yhi + 1, batch):
+        if STOP_SCANNING.is_set():
+            return None
+        end = min(start + batch - 1, yhi)
+        gap = first_gap_in_rows(SHARED_SENSORS, start, end, maxx, batch)
+        if gap is not None:
+            STOP_SCANNING.set()
+            return gap
+    return None
+
+
+def find_uncovered_by_scanning(
+    sensors: List[SensorInformation],
+    maxxy: int,
+    n_workers: Optional[int] = None,
+    chunk: int = 65_536,
+    batch: int = 1024
+) -> Optional[Coord]:
+    # Brute force row scan for when the diagonal trick in `find_uncovered`
+    # doesn't apply. Row ranges are handed out to worker processes, which all
+    # read the sensors out of one shared memory block. The first gap found
+    # stops the others.
+    array = sensor_array(sensors)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        np.ndarray(array.shape, dtype=np.int64, buffer=shm.buf)[:] = array
+        stop = Event()
+        with ProcessPoolExecutor(
+            n_workers or cpu_count() or 1,
+            initializer=attach_sensors,
+            initargs=(shm.name, array.shape, stop)
+        ) as pool:
+            futures = [
+                pool.submit(scan_chunk, ylo, min(ylo + chunk - 1, maxxy), maxxy, batch)
+                for ylo in range(0, maxxy + 1, chunk)
+            ]
+            for future in as_completed(futures):
+                if (gap := future.result()) is not None:
+                    stop.set()
+                    pool.shutdown(cancel_futures=True)
+                    return gap
+        return None
+    finally:
+        shm.close()
+        shm.unlink()
+
+
 if __name__ == '__main__':
     YLEVEL = 2_000_000
     MAXXY = 4_000_000
@@ -129,15 +298,6 @@ if __name__ == '__main__':
     print(f"The total empty space is: {total_length - n_objects_in_intervals}")
 
 
-    for ylevel in range(0, MAXXY + 1):
-        if ylevel % 100_000 == 0:
-             print('.', end='', flush=True)
-        intervals = [interval_at_level(sensor, ylevel=ylevel) for sensor in sensors]
-        intervals = reduce([i for i in intervals if i is not None])
-        intervals = intersect(intervals, (0, MAXXY))
-        total_length = sum(
-            i[1] - i[0] + 1 for i in intervals
-        )
-        # Should be exactly one hit!
-        if total_length != MAXXY + 1:
-            print(str(ylevel) + ': ' + str(intervals) + '\n')
\ No newline at end of file
+    beacon = find_uncovered(sensors, MAXXY)
+    print(f"The distress beacon is at: {beacon}")
+    print(f"Its tuning frequency is: {beacon[0] * 4_000_000 + beacon[1]}")
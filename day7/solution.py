@@ -1,21 +1,27 @@
 from aocd import get_data # type: ignore
+from array import array
 from enum import Enum
 from dataclasses import dataclass
-from typing import Optional, Union, List, Tuple
+from typing import Optional, Union, List, Tuple, Dict, Set
+import numpy as np
 
 class FileSystemObject:
-    pass
+    __slots__ = ()
 
 class Directory(FileSystemObject):
+    __slots__ = ('name', 'totsize', 'flushed', 'parent', 'children', 'is_dir')
 
     def __init__(self, name: str, parent: 'Directory'):
         self.name = name
         self.totsize = 0
+        self.flushed = 0
         self.parent = parent
-        self.children: List[FileSystemObject] = []
+        # Keyed by name, so `cd` into a child is a single lookup.
+        self.children: Dict[str, FileSystemObject] = {}
         self.is_dir = True
 
 class File(FileSystemObject):
+    __slots__ = ('name', 'size', 'parent', 'is_dir')
 
     def __init__(self, name: str, size: int, parent: Directory):
         self.name = name
@@ -34,14 +40,13 @@ class Command(Enum):
     CHANGEDIR = 1
 
 
-def build_filesystem(data: str) -> Directory:
-    root = workingdir = Directory('/', parent=None)
-    readstate = ReaderState.COMMAND
-    lines = iter(data.split('\n'))
+class FileSystemReader:
 
-    next(lines) # First command of `cd /` can be discarded.`
+    def __init__(self):
+        self.root = self.workingdir = Directory('/', parent=None)
+        self.directories: List[Directory] = [self.root]
 
-    for line in lines:
+    def read(self, line: str):
 
         # First parse the command.
         if line.startswith('$'):
@@ -57,22 +62,68 @@ def build_filesystem(data: str) -> Directory:
         # Then update the filesystem state.
         if readstate == ReaderState.COMMAND and command == Command.CHANGEDIR:
             if arg == '..':
-                workingdir = workingdir.parent
-                continue
-            workingdir = next(
-                obj for obj in workingdir.children
-                if obj.is_dir and obj.name == arg
-            )
+                self.leave()
+            elif arg == '/':
+                self.finish()
+            else:
+                self.workingdir = self.workingdir.children[arg]
         elif readstate == ReaderState.COMMAND and command == Command.LIST:
-                continue
+                return
+        elif name in self.workingdir.children:
+            return  # Already listed, don't count it twice.
         elif readstate == ReaderState.LISTINGDIR:
-            newdir = Directory(name=name, parent=workingdir)
-            workingdir.children.append(newdir)
+            newdir = Directory(name=name, parent=self.workingdir)
+            self.workingdir.children[name] = newdir
+            self.directories.append(newdir)
         elif readstate == ReaderState.LISTINGFILE:
-            newfile = File(name=name, size=int(size), parent=workingdir)
-            workingdir.children.append(newfile)
+            newfile = File(name=name, size=int(size), parent=self.workingdir)
+            self.workingdir.children[name] = newfile
+            self.workingdir.totsize += newfile.size
+
+    def leave(self):
+        # Sizes are pushed up to the parent lazily, on the way out.
+        pending = self.workingdir.totsize - self.workingdir.flushed
+        self.workingdir.parent.totsize += pending
+        self.workingdir.flushed = self.workingdir.totsize
+        self.workingdir = self.workingdir.parent
+
+    def finish(self) -> Directory:
+        while self.workingdir is not self.root:
+            self.leave()
+        return self.root
+
+    def running_total(self, dir: Directory) -> int:
+        # Only directories on the working path can have unflushed sizes
+        # below them, everything else is already up to date.
+        pending, current = 0, self.workingdir
+        while current is not dir and current is not None:
+            pending += current.totsize - current.flushed
+            current = current.parent
+        return dir.totsize + (pending if current is dir else 0)
 
-    return root
+    def smallest_directory_over(self, minsize: int) -> Optional[Directory]:
+        totals = self.running_totals()
+        return min(
+            (dir for dir in self.directories if totals[dir] >= minsize),
+            key=lambda dir: totals[dir],
+            default=None
+        )
+
+    def running_totals(self) -> Dict[Directory, int]:
+        totals = {dir: dir.totsize for dir in self.directories}
+        pending, current = 0, self.workingdir
+        while current is not None:
+            totals[current] += pending
+            pending += current.totsize - current.flushed
+            current = current.parent
+        return totals
+
+
+def build_filesystem(data: str) -> Directory:
+    reader = FileSystemReader()
+    for line in data.split('\n'):
+        reader.read(line)
+    return reader.finish()
 
 def parse_command(line: str) -> Tuple[Command, str]:
     command = line[2:]  # line = '$ the part we care about'
@@ -92,28 +143,122 @@ def parse_file_listing(line: str) -> Tuple[int, str]:
     return int(size.strip()), name.strip()
 
 def accumulate_filesizes(dir: Directory) -> int:
-    totsize = 0
-    for obj in dir.children:
-        if obj.is_dir:
-            totsize += accumulate_filesizes(obj)
-        else:
-            totsize += obj.size
-    dir.totsize = totsize
-    return totsize
+    # Children always come after their parent in a pre-order listing, so
+    # walking it backwards is a post-order pass without any recursion.
+    for subdir in reversed(find_all_subdirectories(dir)):
+        subdir.totsize = sum(
+            obj.totsize if obj.is_dir else obj.size
+            for obj in subdir.children.values()
+        )
+    return dir.totsize
 
 def find_all_subdirectories(dir: Directory, maxsize: int=0) -> List[Directory]:
     subdirectories = [dir]
-    for obj in dir.children:
-        if obj.is_dir:
-            subdirectories.extend(find_all_subdirectories(obj))
+    stack = [dir]
+    while stack:
+        for obj in stack.pop().children.values():
+            if obj.is_dir:
+                subdirectories.append(obj)
+                stack.append(obj)
     return subdirectories
 
 
+class FlatFileSystem:
+    """Struct-of-arrays filesystem: entry i has parent[i], size[i], depth[i]
+    and its name at names[nameoffsets[i]:nameoffsets[i+1]]. Entry 0 is the
+    root, and every entry comes after its parent.
+    """
+
+    def __init__(self):
+        self._parent = array('q', [-1])
+        self._size = array('q', [0])
+        self._depth = array('q', [0])
+        self._isdir = array('b', [1])
+        self._nameoffsets = array('q', [0, 1])
+        self._names = bytearray(b'/')
+        # Directories by parent and name, looked up on `cd`. Files are never
+        # indexed, and the whole index goes once the filesystem is frozen.
+        self._index: Dict[Tuple[int, str], int] = {}
+
+    def add(self, name: str, parent: int, size: int = 0, is_dir: bool = False) -> int:
+        self._parent.append(parent)
+        self._size.append(size)
+        self._depth.append(self._depth[parent] + 1)
+        self._isdir.append(is_dir)
+        self._names += name.encode()
+        self._nameoffsets.append(len(self._names))
+        idx = len(self._parent) - 1
+        if is_dir:
+            self._index[parent, name] = idx
+        return idx
+
+    @staticmethod
+    def from_str(data: str) -> 'FlatFileSystem':
+        fs = FlatFileSystem()
+        workingdir = 0
+        # A directory listed a second time already has all its entries, so
+        # its later listings are skipped whole.
+        listed: Set[int] = set()
+        relisting = False
+        for line in data.split('\n'):
+            if line.startswith('$'):
+                command, arg = parse_command(line)
+                if command == Command.LIST:
+                    relisting = workingdir in listed
+                    listed.add(workingdir)
+                elif command == Command.CHANGEDIR and arg == '..':
+                    workingdir = fs._parent[workingdir]
+                elif command == Command.CHANGEDIR and arg == '/':
+                    workingdir = 0
+                elif command == Command.CHANGEDIR:
+                    workingdir = fs._index[workingdir, arg]
+            elif relisting:
+                continue
+            elif line.startswith('dir'):
+                fs.add(parse_directory_listing(line), workingdir, is_dir=True)
+            else:
+                size, name = parse_file_listing(line)
+                fs.add(name, workingdir, size=size)
+        fs.freeze()
+        return fs
+
+    def name(self, idx: int) -> str:
+        return self._names[self._nameoffsets[idx]:self._nameoffsets[idx + 1]].decode()
+
+    def freeze(self):
+        del self._index
+        self.parent = np.frombuffer(self._parent, dtype=np.int64)
+        self.size = np.frombuffer(self._size, dtype=np.int64)
+        self.depth = np.frombuffer(self._depth, dtype=np.int64)
+        self.is_dir = np.frombuffer(self._isdir, dtype=np.int8).astype(bool)
+        self.totsize = self.accumulate_filesizes()
+
+    def accumulate_filesizes(self) -> np.ndarray:
+        # Reverse sweep over depth levels, deepest first: each level adds its
+        # subtree sizes into the level above in a single scatter.
+        totsize = self.size.copy()
+        order = np.argsort(self.depth, kind='stable')
+        bounds = np.searchsorted(self.depth[order], np.arange(self.depth.max() + 2))
+        for level in range(self.depth.max(), 0, -1):
+            idxs = order[bounds[level]:bounds[level + 1]]
+            np.add.at(totsize, self.parent[idxs], totsize[idxs])
+        return totsize
+
+    def small_directories_total(self, maxsize: int) -> int:
+        return int(self.totsize[self.is_dir & (self.totsize <= maxsize)].sum())
+
+    def deletion_candidate(self, minsize: int) -> Optional[int]:
+        candidates = np.flatnonzero(self.is_dir & (self.totsize >= minsize))
+        if len(candidates) == 0:
+            return None
+        return int(candidates[np.argmin(self.totsize[candidates])])
+
+
 if __name__ == '__main__':
     data = get_data(day=7, year=2022)
 
     root = build_filesystem(data)
-    USED_SPACE = accumulate_filesizes(root)
+    USED_SPACE = root.totsize
     DIRS = find_all_subdirectories(root)
 
     smoldirs = [dir for dir in DIRS if dir.totsize <= 100_000]
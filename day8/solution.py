@@ -1,86 +1,78 @@
 from aocd import get_data # type: ignore
-from itertools import pairwise, product
-from typing import List, Tuple, Dict
+from typing import List, Tuple
+import numpy as np
 
-TreePlot = List[List[int]]
+TreePlot = np.ndarray
 TreeRow = List[int]
 Position = Tuple[int, int]
 
 
 def parse_data(data: str) -> TreePlot:
-    return [
+    return np.array([
         [int(d) for d in line]
         for line in data.split('\n')
-    ]
-
-def transpose(trees: TreePlot) -> TreePlot:
-    N, M = len(trees), len(trees[0])
-    return [
-        [trees[j][i] for j in range(N)]
-        for i in range(M)
-    ]
-
-def visible_from_one_end(row: TreeRow) -> List[bool]:
-    N = len(row)
-    # Cumulative maximum.
-    maxfromend = [max(row[:idx+1]) for idx in range(N)]
-    return [True] + [left < right for left, right in pairwise(maxfromend)]
-
-def visible_1d(row: TreeRow) -> List[bool]:
-    visiblefromleft = visible_from_one_end(row)
-    visiblefromright = visible_from_one_end(row[::-1])[::-1]
-    # Componentwise or.
-    visible = [vfl or vfr for vfl, vfr in zip(visiblefromleft, visiblefromright)]
-    return visible
-
-def visible_rowwise(trees: TreePlot) -> List[List[bool]]:
-    return [visible_1d(row) for row in trees]
-
-def visible_from_edges(trees: TreePlot) -> List[List[bool]]:
-    rowwise = visible_rowwise(trees)
-    colwise = transpose(visible_rowwise(transpose(trees)))
-    # Componentwise or.
-    return [
-        [rwv or cwv for rwv, cwv in zip(rwrow, cwrow)]
-        for rwrow, cwrow in zip(rowwise, colwise)
-    ]
-
-def viewing_distance(row: TreeRow, height: int) -> int:
-    for idx, h in enumerate(row):
-        if h >= height:
-            return idx + 1
-    return len(row)
-
-def score_viewing_distance_from_position(trees: TreePlot, p: Position) -> int:
-    N, M = len(trees), len(trees[0])
-    height = trees[p[0]][p[1]]
-    rightwards = trees[p[0]][p[1] + 1:]
-    leftwards = trees[p[0]][:p[1]][::-1]
-    above = [trees[i][p[1]] for i in range(0, p[0])][::-1]
-    below = [trees[i][p[1]] for i in range(p[0]+1, N)]
-    return (
-        viewing_distance(rightwards, height)
-        * viewing_distance(leftwards, height)
-        * viewing_distance(above, height)
-        * viewing_distance(below, height)
-    )
-
-def score_viewing_distance_from_each_position(trees: TreePlot) -> Dict[Position, int]:
-    N, M = len(trees), len(trees[0])
-    scores = {}
-    for i, j in product(range(N), range(M)):
-        scores[i, j] = score_viewing_distance_from_position(trees, (i, j))
-    return scores
+    ], dtype=np.int8)
+
+def visible_from_one_end(trees: TreePlot, axis: int) -> np.ndarray:
+    # A tree is visible if it is taller than the cumulative maximum of
+    # everything before it along the axis.
+    maxbefore = np.maximum.accumulate(trees, axis=axis)
+    maxbefore = np.roll(maxbefore, 1, axis=axis)
+    edge = [slice(None), slice(None)]
+    edge[axis] = 0
+    maxbefore[tuple(edge)] = -1
+    return trees > maxbefore
+
+def visible_1d(trees: TreePlot, axis: int) -> np.ndarray:
+    visiblefromstart = visible_from_one_end(trees, axis)
+    visiblefromend = np.flip(visible_from_one_end(np.flip(trees, axis), axis), axis)
+    return visiblefromstart | visiblefromend
+
+def visible_from_edges(trees: TreePlot) -> np.ndarray:
+    return visible_1d(trees, axis=1) | visible_1d(trees, axis=0)
+
+def viewing_distances_from_start(row: TreeRow, out: np.ndarray):
+    # Monotonic stack of indices whose heights are strictly decreasing. The
+    # first tree left on the stack that's at least as tall blocks the view.
+    stack: List[int] = []
+    for idx, height in enumerate(row):
+        while stack and row[stack[-1]] < height:
+            stack.pop()
+        out[idx] = idx - stack[-1] if stack else idx
+        stack.append(idx)
+
+def viewing_distances_from_end(row: TreeRow) -> np.ndarray:
+    distances = np.empty(len(row), dtype=np.int64)
+    viewing_distances_from_start(row[::-1], distances)
+    return distances[::-1]
+
+def viewing_distances_1d(trees: TreePlot, axis: int, out: np.ndarray):
+    lines, distances = np.moveaxis(trees, axis, 1), np.moveaxis(out, axis, 1)
+    for line, distance in zip(lines.tolist(), distances):
+        viewing_distances_from_start(line, distance)
+        distance *= viewing_distances_from_end(line)
+
+def score_viewing_distance_from_each_position(trees: TreePlot) -> np.ndarray:
+    rowwise = np.empty(trees.shape, dtype=np.int64)
+    colwise = np.empty(trees.shape, dtype=np.int64)
+    viewing_distances_1d(trees, axis=1, out=rowwise)
+    viewing_distances_1d(trees, axis=0, out=colwise)
+    rowwise *= colwise
+    return rowwise
+
+def best_viewing_position(trees: TreePlot) -> Tuple[Position, int]:
+    scores = score_viewing_distance_from_each_position(trees)
+    position = np.unravel_index(np.argmax(scores), scores.shape)
+    return (int(position[0]), int(position[1])), int(scores[position])
 
 
 if __name__ == '__main__':
     data = get_data(day=8, year=2022)
     trees = parse_data(data)
 
-    totvis = sum(sum(row) for row in visible_from_edges(trees))
+    totvis = visible_from_edges(trees).sum()
     print(f"The total number of visible trees is {totvis}")
 
-    scores = score_viewing_distance_from_each_position(trees)
-    maxscore = max(scores.values())
+    _, maxscore = best_viewing_position(trees)
     print(f"The maximum treehouse score is {maxscore}")
 
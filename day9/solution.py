@@ -2,7 +2,8 @@ from aocd import get_data # type: ignore
 from enum import Enum
 from dataclasses import dataclass
 from itertools import pairwise
-from typing import List, Tuple
+from typing import List, Tuple, Set, Dict, Iterable, Optional, Union
+import numpy as np
 
 Position = Tuple[int, int]
 PositionΔ = Tuple[int, int]
@@ -47,10 +48,68 @@ class Move:
             case Move(Direction.RIGHT, n):
                 return (n, 0)
 
+class VisitedSet:
+
+    def __init__(self, position: Position):
+        self.cells: Set[Position] = {position}
+
+    def add(self, position: Position):
+        self.cells.add(position)
+
+    def add_line(self, start: Position, Δ: PositionΔ, times: int):
+        self.cells.update(
+            (start[0] + n * Δ[0], start[1] + n * Δ[1])
+            for n in range(1, times + 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+class VisitedGrid:
+    """Visited cells as sparse square bitmap tiles, created only once a knot
+    first steps into them, with a running count of the cells set. Memory
+    follows the cells visited, at one byte each within the touched tiles.
+    """
+
+    def __init__(self, position: Position, tilesize: int = 64):
+        self.tilesize = tilesize
+        self.tiles: Dict[Position, np.ndarray] = {}
+        self.count = 0
+        self.add(position)
+
+    def add(self, position: Position):
+        self.add_line(position, (0, 0), 0)
+
+    def add_line(self, start: Position, Δ: PositionΔ, times: int):
+        end = (start[0] + times * Δ[0], start[1] + times * Δ[1])
+        xlo, xhi = sorted((start[0], end[0]))
+        ylo, yhi = sorted((start[1], end[1]))
+        # Rope moves are always along an axis, so the line is a run of
+        # slices, one per tile it passes through.
+        n = self.tilesize
+        for tx in range(xlo // n, xhi // n + 1):
+            for ty in range(ylo // n, yhi // n + 1):
+                tile = self.tiles.get((tx, ty))
+                if tile is None:
+                    tile = self.tiles[tx, ty] = np.zeros((n, n), dtype=bool)
+                block = tile[
+                    max(xlo - tx * n, 0):min(xhi - tx * n, n - 1) + 1,
+                    max(ylo - ty * n, 0):min(yhi - ty * n, n - 1) + 1
+                ]
+                self.count += block.size - int(np.count_nonzero(block))
+                block[...] = True
+
+    def __len__(self) -> int:
+        return self.count
+
+Visited = Union[VisitedSet, VisitedGrid]
+
+
 class Knot:
-    def __init__(self, x: int, y: int):
+    def __init__(self, x: int, y: int, track: bool = False):
         self.position = (x, y)
-        self.history: List[Position] = [(x, y)]
+        self.visited: Optional[Set[Position]] = {(x, y)} if track else None
 
     def move(self, move: Move):
         moveΔ = move.to_Δ()
@@ -62,7 +121,8 @@ class Knot:
 
     def move_to(self, position: Position):
         self.position = position
-        self.history.append(position)
+        if self.visited is not None:
+            self.visited.add(position)
 
     def follow(self, leader: 'Knot'):
         positionΔ = (
@@ -77,10 +137,67 @@ class Knot:
             self.position[1] + sign(positionΔ[1])
         ))
 
+class Rope:
+    """A whole rope as two flat coordinate lists, driven by run-length moves.
+
+    Once a step moves every knot by the same amount as the head, the rope is
+    rigidly translating and stays that way for the rest of the move, so the
+    remaining steps are applied in one jump.
+
+    Only the knots in `tracked` record their visits, into a VisitedSet or a
+    VisitedGrid.
+    """
+
+    def __init__(
+        self,
+        n_knots: int,
+        tracked: Iterable[int] = (-1,),
+        visitedtype: type = VisitedSet
+    ):
+        self.xs = [0] * n_knots
+        self.ys = [0] * n_knots
+        self.visited: Dict[int, Visited] = {
+            idx % n_knots: visitedtype((0, 0)) for idx in tracked
+        }
+
+    def move(self, move: Move):
+        xs, ys = self.xs, self.ys
+        dx, dy = (sign(d) for d in move.to_Δ())
+        for step in range(move.times):
+            xs[0] += dx
+            ys[0] += dy
+            rigid = True
+            for idx in range(1, len(xs)):
+                Δx, Δy = xs[idx - 1] - xs[idx], ys[idx - 1] - ys[idx]
+                # Still touching, so nothing further down the rope moves.
+                if abs(Δx) <= 1 and abs(Δy) <= 1:
+                    rigid = False
+                    break
+                xs[idx] += sign(Δx)
+                ys[idx] += sign(Δy)
+                rigid = rigid and (sign(Δx), sign(Δy)) == (dx, dy)
+            for idx, visited in self.visited.items():
+                visited.add((xs[idx], ys[idx]))
+            if rigid:
+                self.translate(dx, dy, move.times - step - 1)
+                return
+
+    def translate(self, dx: int, dy: int, times: int):
+        for idx, visited in self.visited.items():
+            visited.add_line((self.xs[idx], self.ys[idx]), (dx, dy), times)
+        self.xs = [x + times * dx for x in self.xs]
+        self.ys = [y + times * dy for y in self.ys]
+
+    def n_visited(self, idx: int = -1) -> int:
+        return len(self.visited[idx % len(self.xs)])
+
+    def visit_counts(self) -> Dict[int, int]:
+        # Keyed by rope length, same as `move_rope`.
+        return {idx + 1: len(visited) for idx, visited in self.visited.items()}
+
+
 def parse_data(data: str) -> List[Move]:
-    return to_single_moves([
-        Move.from_str(line) for line in data.split('\n')
-    ])
+    return [Move.from_str(line) for line in data.split('\n')]
 
 def to_single_moves(moves: List[Move]) -> List[Move]:
     flatmoves: List[Move] = []
@@ -88,23 +205,26 @@ def to_single_moves(moves: List[Move]) -> List[Move]:
         flatmoves.extend([Move(move.direction, 1) for _ in range(move.times)])
     return flatmoves
 
-def move_rope(rope: List[Knot], moves: List[Move]):
-    for move in moves:
+def move_rope(rope: List[Knot], moves: List[Move]) -> Dict[int, int]:
+    for move in to_single_moves(moves):
         rope[0].move(move)
         for head, tail in pairwise(rope):
             tail.follow(head)
+    # The first k knots of a rope move exactly like a rope of length k, so
+    # every tracked knot is the tail of some shorter rope.
+    return {
+        idx + 1: len(knot.visited)
+        for idx, knot in enumerate(rope) if knot.visited is not None
+    }
 
 
 if __name__ == '__main__':
     data = get_data(day=9, year=2022)
     moves = parse_data(data)
 
-    rope = [Knot(0, 0), Knot(0, 0)]
-    move_rope(rope, moves)
-    n_visited_tail = len(set(rope[-1].history))
-    print(f"The number of positions visited by the tail is {n_visited_tail}")
-
-    rope = [Knot(0, 0) for _ in range(10)]
-    move_rope(rope, moves)
-    n_visited_tail = len(set(rope[-1].history))
-    print(f"The number of positions visited by the tail is {n_visited_tail}")
\ No newline at end of file
+    rope = Rope(10, tracked=range(1, 10))
+    for move in moves:
+        rope.move(move)
+    n_visited_tail = rope.visit_counts()
+    print(f"The number of positions visited by the tail is {n_visited_tail[2]}")
+    print(f"The number of positions visited by the tail is {n_visited_tail[10]}")
\ No newline at end of file